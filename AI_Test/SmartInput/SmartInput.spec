@@ -15,7 +15,7 @@ a = Analysis(
     ['main.py'],
     pathex=[],
     binaries=[],
-    datas=[(pinyin2hanzi_data, 'Pinyin2Hanzi/data'), ('zh.png', '.'), ('en.png', '.')],
+    datas=[(pinyin2hanzi_data, 'Pinyin2Hanzi/data')],
     hiddenimports=['PIL', 'PIL._imagingtk', 'PIL._tkinter_finder', 'pystray'],
     hookspath=[],
     hooksconfig={},
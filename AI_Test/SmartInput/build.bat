@@ -36,7 +36,15 @@ if errorlevel 1 (
 )
 
 echo.
-echo [步骤 3] 运行 PyInstaller...
+echo [步骤 3] 使用 mypyc 编译热点模块（可选）...
+pip install -q mypy
+mypyc smartinput_hot.py
+if errorlevel 1 (
+    echo 警告: mypyc 编译失败，将使用纯 Python 版本的 smartinput_hot
+)
+
+echo.
+echo [步骤 4] 运行 PyInstaller...
 python -m PyInstaller SmartInput.spec --distpath dist
 if errorlevel 1 (
     echo 错误: PyInstaller 打包失败
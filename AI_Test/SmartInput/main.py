@@ -40,20 +40,26 @@ SmartInput - 智能自适应中英文输入法
 
 import sys
 import os
+import base64
+import zlib
+import ctypes
+from ctypes import wintypes
+import functools
+import itertools
 import threading
 import queue
 import tkinter as tk
 from tkinter import ttk
 from pathlib import Path
 from dataclasses import dataclass
-from typing import List, Tuple
+from typing import Tuple
 import warnings
 
 # 导入依赖库
 try:
     from pynput import keyboard
     from pystray import Icon, Menu, MenuItem
-    from PIL import Image, ImageDraw, ImageFont
+    from PIL import Image
     from Pinyin2Hanzi import DefaultDagParams
     from Pinyin2Hanzi.dag import dag
 except ImportError as e:
@@ -61,133 +67,387 @@ except ImportError as e:
     print("请运行: pip install -r requirements.txt")
     sys.exit(1)
 
+# 热点路径（可用 mypyc 编译，见 smartinput_hot.py）
+from smartinput_hot import (
+    leading_syllables,
+    is_pinyin_sequence_prefix,
+    input_buf,
+    buffer_append,
+    buffer_backspace,
+    buffer_drop_head,
+    buffer_clear,
+    buffer_text,
+)
+
 # 忽略特定警告
 warnings.filterwarnings('ignore')
 
-# ==================== 资源路径处理 ====================
-def resource_path(relative_path):
+# 调试输出开关：设置环境变量 SMARTINPUT_DEBUG=1 时打印每次按键的处理细节
+DEBUG = os.environ.get("SMARTINPUT_DEBUG") == "1"
+
+# ==================== 文本上屏（Win32 SendInput） ====================
+
+# Win32 常量
+INPUT_KEYBOARD = 1
+KEYEVENTF_EXTENDEDKEY = 0x0001
+KEYEVENTF_KEYUP = 0x0002
+KEYEVENTF_UNICODE = 0x0004
+LLKHF_EXTENDED = 0x01  # KBDLLHOOKSTRUCT.flags：扩展键（方向键、小键盘 Enter 等）
+LLKHF_INJECTED = 0x10  # KBDLLHOOKSTRUCT.flags：事件由 SendInput 注入
+WM_KEYDOWN = 0x0100
+WM_KEYUP = 0x0101
+WM_SYSKEYDOWN = 0x0104
+WM_SYSKEYUP = 0x0105
+VK_BACK = 0x08
+VK_RETURN = 0x0D
+VK_SHIFT = 0x10
+VK_CONTROL = 0x11
+VK_MENU = 0x12
+VK_CAPITAL = 0x14
+VK_ESCAPE = 0x1B
+VK_SPACE = 0x20
+VK_LWIN = 0x5B
+VK_RWIN = 0x5C
+VK_LSHIFT = 0xA0
+VK_RSHIFT = 0xA1
+VK_LCONTROL = 0xA2
+VK_RCONTROL = 0xA3
+VK_LMENU = 0xA4
+VK_RMENU = 0xA5
+
+ULONG_PTR = ctypes.c_size_t
+
+class MOUSEINPUT(ctypes.Structure):
+    _fields_ = [
+        ("dx", wintypes.LONG),
+        ("dy", wintypes.LONG),
+        ("mouseData", wintypes.DWORD),
+        ("dwFlags", wintypes.DWORD),
+        ("time", wintypes.DWORD),
+        ("dwExtraInfo", ULONG_PTR),
+    ]
+
+class KEYBDINPUT(ctypes.Structure):
+    _fields_ = [
+        ("wVk", wintypes.WORD),
+        ("wScan", wintypes.WORD),
+        ("dwFlags", wintypes.DWORD),
+        ("time", wintypes.DWORD),
+        ("dwExtraInfo", ULONG_PTR),
+    ]
+
+class HARDWAREINPUT(ctypes.Structure):
+    _fields_ = [
+        ("uMsg", wintypes.DWORD),
+        ("wParamL", wintypes.WORD),
+        ("wParamH", wintypes.WORD),
+    ]
+
+class _INPUTUNION(ctypes.Union):
+    _fields_ = [("mi", MOUSEINPUT), ("ki", KEYBDINPUT), ("hi", HARDWAREINPUT)]
+
+class INPUT(ctypes.Structure):
+    _anonymous_ = ("u",)
+    _fields_ = [("type", wintypes.DWORD), ("u", _INPUTUNION)]
+
+def commit_text(text):
     """
-    获取资源文件的绝对路径。
-    支持 PyInstaller 打包后的资源访问。
+    将文本上屏到当前焦点窗口。
+    每个 UTF-16 码元生成一对按下/抬起事件，整段文本通过一次 SendInput 调用注入。
     
     Args:
-        relative_path (str): 相对于项目根目录的资源路径
+        text (str): 要上屏的文本
+    """
+    if not text:
+        return
+    
+    if sys.platform != "win32":
+        # 非 Windows 环境（开发调试）：仅在控制台显示
+        print(f"[上屏] {text}")
+        return
+    
+    data = text.encode('utf-16-le')
+    units = [int.from_bytes(data[i:i + 2], 'little') for i in range(0, len(data), 2)]
+    
+    count = 2 * len(units)
+    inputs = (INPUT * count)()
+    for i, unit in enumerate(units):
+        down = inputs[2 * i]
+        down.type = INPUT_KEYBOARD
+        down.ki.wScan = unit
+        down.ki.dwFlags = KEYEVENTF_UNICODE
         
+        up = inputs[2 * i + 1]
+        up.type = INPUT_KEYBOARD
+        up.ki.wScan = unit
+        up.ki.dwFlags = KEYEVENTF_UNICODE | KEYEVENTF_KEYUP
+    
+    sent = ctypes.windll.user32.SendInput(count, inputs, ctypes.sizeof(INPUT))
+    if sent != count:
+        print(f"[错误] 上屏失败: 仅注入 {sent}/{count} 个事件")
+
+# 重放按键时需要还原的修饰键（左右区分；右 Ctrl/右 Alt 与 Win 为扩展键）
+REPLAY_MODIFIER_VKS = (
+    VK_LSHIFT, VK_RSHIFT, VK_LCONTROL, VK_RCONTROL, VK_LMENU, VK_RMENU, VK_LWIN, VK_RWIN,
+)
+_EXTENDED_MODIFIER_VKS = frozenset({VK_RCONTROL, VK_RMENU, VK_LWIN, VK_RWIN})
+
+def modifiers_down():
+    """
+    当前按下的修饰键（仅 Windows 调用）。
+    
     Returns:
-        str: 绝对路径
+        FrozenSet[int]: 按下的修饰键虚拟键码
     """
-    if hasattr(sys, '_MEIPASS'):
-        # PyInstaller 打包模式
-        base_path = sys._MEIPASS
-    else:
-        # 开发模式
-        base_path = os.path.dirname(os.path.abspath(__file__))
+    state = ctypes.windll.user32.GetAsyncKeyState
+    return frozenset(vk for vk in REPLAY_MODIFIER_VKS if state(vk) & 0x8000)
+
+def send_key(vk, scan, flags, modifiers=None):
+    """
+    重新注入一个被暂缓的按键事件（用于保持按键与上屏文本的先后顺序）。
+    按键被暂缓期间修饰键可能已经变化（如 Ctrl+V 重放前 Ctrl 已松开），
+    因此在按键前后临时按下/松开修饰键，使其与按键发生时一致；整组事件通过一次 SendInput 注入。
+    
+    Args:
+        vk (int): 虚拟键码
+        scan (int): 扫描码
+        flags (int): KEYEVENTF_* 标志
+        modifiers (FrozenSet[int]): 按键发生时按下的修饰键，为 None 时不做还原
+    """
+    if sys.platform != "win32":
+        return
+    
+    press = release = ()
+    if modifiers is not None:
+        held = modifiers_down()
+        press = sorted(modifiers - held)
+        release = sorted(held - modifiers)
+    
+    events = (
+        [(m, 0, KEYEVENTF_KEYUP) for m in release]
+        + [(m, 0, 0) for m in press]
+        + [(vk, scan, flags)]
+        + [(m, 0, KEYEVENTF_KEYUP) for m in reversed(press)]
+        + [(m, 0, 0) for m in reversed(release)]
+    )
+    
+    count = len(events)
+    inputs = (INPUT * count)()
+    for inp, (key, key_scan, key_flags) in zip(inputs, events):
+        inp.type = INPUT_KEYBOARD
+        inp.ki.wVk = key
+        inp.ki.wScan = key_scan
+        if key in _EXTENDED_MODIFIER_VKS:
+            key_flags |= KEYEVENTF_EXTENDEDKEY
+        inp.ki.dwFlags = key_flags
     
-    return os.path.join(base_path, relative_path)
+    sent = ctypes.windll.user32.SendInput(count, inputs, ctypes.sizeof(INPUT))
+    if sent != count:
+        print(f"[错误] 按键重放失败: vk={vk:#04x}，仅注入 {sent}/{count} 个事件")
+
+def _ctrl_down():
+    """
+    Ctrl 是否处于按下状态。
+    Windows 下直接读取系统按键状态，无需跟踪按下/抬起事件。
+    """
+    if sys.platform == "win32":
+        return bool(ctypes.windll.user32.GetAsyncKeyState(VK_CONTROL) & 0x8000)
+    return ctrl_pressed
+
+def _shift_down():
+    """
+    Shift 是否处于按下状态。
+    Windows 下直接读取系统按键状态，无需跟踪按下/抬起事件。
+    """
+    if sys.platform == "win32":
+        return bool(ctypes.windll.user32.GetAsyncKeyState(VK_SHIFT) & 0x8000)
+    return shift_pressed
+
+def _win_down():
+    """
+    Win 键是否处于按下状态（Win+字母等系统快捷键不经过输入法）。
+    """
+    if sys.platform == "win32":
+        user32 = ctypes.windll.user32
+        return bool((user32.GetAsyncKeyState(VK_LWIN) | user32.GetAsyncKeyState(VK_RWIN)) & 0x8000)
+    return False
 
 # ==================== 全局配置与状态 ====================
 
 # 输入法状态
 current_mode = "unknown"  # 当前输入模式: pinyin, english, unknown
-input_buffer = ""  # 输入缓冲区（拼音）
-raw_input_buffer = ""  # 原始输入缓冲区
-current_candidates = []  # 当前候选词列表
+current_candidates = ()  # 当前候选词元组
 
-# 快捷键状态跟踪
+# 快捷键状态跟踪（仅非 Windows 环境使用，Windows 下通过 GetAsyncKeyState 读取）
 ctrl_pressed = False  # 跟踪 Ctrl 键状态
 shift_pressed = False  # 跟踪 Shift 键状态
 
+# 键盘监听器（win32_event_filter 中需要调用 listener.suppress_event()）
+listener = None
+_suppressed_vks = set()  # 按下时已拦截的虚拟键码，对应的抬起事件也一并拦截
+
 # 通信队列
 ui_queue = queue.Queue()  # UI 更新队列
 stop_event = threading.Event()  # 停止事件
+_ui_wake = threading.Event()  # 唤醒 UI 工作线程（有新状态或需要停止时置位）
+_ui_lock = threading.Lock()  # 保证 ui_put 的去重、清空与入队是原子的
+
+# 候选词计算（在独立工作线程中执行，不阻塞键盘回调）
+candidate_queue = queue.Queue(maxsize=1)  # 候选词请求队列（仅保留最新请求）
+candidate_lock = threading.Lock()  # 保护候选词请求序号与结果
+latest_seq = itertools.count(1)  # 请求序号生成器
+candidate_seq = 0  # 最新请求序号
+candidates_seq = 0  # current_candidates 对应的请求序号
+
+# 上屏（SendInput 与必要的候选词计算在独立工作线程中执行，键盘钩子只负责入队）
+output_queue = queue.Queue()  # 上屏任务队列（按入队顺序执行）
+_pending_tray_mode = None  # 等待 UI 工作线程刷新到托盘的模式
 
-# Pinyin2Hanzi 初始化
-dag_params = DefaultDagParams()
+# Pinyin2Hanzi 初始化（词库较大，在后台线程中加载，见 _load_dag）
+dag_params = None
+dag_ready = threading.Event()  # 词库加载完成后置位
+_DAG_LOADED = object()  # 词库加载完成后放入 candidate_queue，唤醒工作线程补算候选
+
+@functools.lru_cache(maxsize=4096)
+def _dag_candidates(syllables, top_k, params):
+    """
+    对完整音节序列调用 dag()，结果按音节序列缓存。
+    
+    这是候选词唯一的一层缓存：用户输入是不断增长的前缀，且经常退格重输，
+    命中缓存时可完全跳过 dag() 计算。音节已转为小写，大小写不同的输入共用缓存；
+    dag_params 加载后不再变化，因此缓存无需失效。
+    
+    Args:
+        syllables (Tuple[str, ...]): 完整音节元组（如 ('ni', 'hao')）
+        top_k (int): 返回前 k 个候选
+        params: DAG 参数对象
+        
+    Returns:
+        Tuple[str, ...]: 候选词元组
+    """
+    result = dag(params, list(syllables), path_num=top_k)
+    return tuple(''.join(item.path) for item in result[:top_k])
 
 def simple_seg(pinyin_str, top_k=5, dagparams=None):
     """
     简化的拼音分词函数，使用 dag 函数实现。
     
+    只有开头的完整音节参与 dag()；尚未输完的尾部（如 'nihaoz' 中的 z）
+    不会产生新的候选，因此尾部变化时直接复用完整音节前缀的缓存结果。
+    候选词只覆盖这些完整音节，上屏时尾部留在缓冲区（见 _commit_buffer）。
+    
     Args:
         pinyin_str (str): 拼音字符串（如 'nihao'）
         top_k (int): 返回前 k 个候选
         dagparams: DAG 参数对象
         
     Returns:
-        List[str]: 候选词列表
+        Tuple[str, ...]: 候选词元组
     """
     if not pinyin_str:
-        return []
+        return ()
     
     try:
-        # 简单的拼音分词处理
-        # 实际使用时可能需要更复杂的分词逻辑
-        pinyin_list = []
-        i = 0
-        while i < len(pinyin_str):
-            # 尝试匹配双字母或单字母拼音
-            if i + 2 <= len(pinyin_str):
-                pinyin_list.append(pinyin_str[i:i+2])
-                i += 2
-            else:
-                pinyin_list.append(pinyin_str[i])
-                i += 1
+        # 按合法音节边界分词，取开头的完整音节
+        syllables = leading_syllables(pinyin_str)
+        if not syllables:
+            return ()
         
         # 使用 dag 函数获取候选
         params = dagparams if dagparams else dag_params
-        result = dag(params, pinyin_list, path_num=top_k)
-        
-        # 提取路径并转换为字符串
-        candidates = [''.join(item.path) for item in result]
-        return candidates[:top_k]
+        return _dag_candidates(tuple(syllables), top_k, params)
     except Exception as e:
         print(f"拼音转换错误: {e}")
-        return []
+        return ()
 
 # ================== 托盘图标相关全局变量 ==================
 tray_icon = None
 tray_menu = None
 tray_thread = None
 tray_stop_event = threading.Event()
+_ICON_CACHE = {}  # 各模式的托盘图标缓存（启动时预加载）
+_last_tray_mode = None  # 托盘当前显示的模式
 
 # ==================== 数据类 ====================
 
-@dataclass
+@dataclass(frozen=True)
 class UIState:
-    """UI 更新状态"""
+    """UI 更新状态（不可变，可比较/哈希）"""
     visible: bool
     buffer: str
-    candidates: List[str]
+    candidates: Tuple[str, ...]
 
-# ==================== 拼音识别函数 ====================
+_last_ui_state = None  # 最近一次提交的 UI 状态
 
-def is_pinyin_sequence_prefix(text):
+def ui_put(state):
     """
-    检查输入文本是否符合拼音序列的前缀。
+    提交 UI 状态。ui_queue 只保留最新状态：入队前丢弃尚未渲染的旧状态。
+    与上一次提交的状态相同时直接跳过。
     
     Args:
-        text (str): 输入的文本
-        
-    Returns:
-        bool: 是否为拼音前缀
+        state (UIState): 新的 UI 状态
     """
-    if not text:
-        return False
+    global _last_ui_state
     
-    # 拼音通常只包含英文字母
-    if not all(c.isalpha() for c in text.lower()):
-        return False
+    with _ui_lock:
+        if state == _last_ui_state:
+            return
+        _last_ui_state = state
+        _put_latest(ui_queue, state)
+    _ui_wake.set()
+
+def _put_latest(q, item):
+    """
+    向只保留最新项的队列放入 item，丢弃尚未取走的旧项。
+    
+    Args:
+        q (queue.Queue): 目标队列
+        item: 新的队列项
+    """
+    while True:
+        try:
+            q.put_nowait(item)
+            return
+        except queue.Full:
+            pass
+        try:
+            while True:
+                q.get_nowait()
+        except queue.Empty:
+            pass
+
+def request_stop():
+    """
+    请求停止程序：置位停止事件，并立即唤醒等待中的工作线程。
+    """
+    stop_event.set()
+    _ui_wake.set()
+    _put_latest(candidate_queue, None)  # 唤醒阻塞在 get() 上的候选词工作线程
+    output_queue.put(None)  # 上屏线程处理完已入队的任务后退出
+
+# ==================== 拼音转换函数 ====================
+
+def _load_dag():
+    """
+    在后台线程中加载 Pinyin2Hanzi 词库。
+    加载期间英文输入照常可用，中文候选在加载完成后才出现。
+    """
+    global dag_params
     
-    # 简单的拼音前缀检查
-    # 完整的拼音识别应该使用专门的库
-    valid_initials = set('bpmfdztnlgkhjqxzcs')
-    valid_finals = set('aeiouüv')
+    try:
+        dag_params = DefaultDagParams()
+    except Exception as e:
+        print(f"[错误] 拼音词库加载失败: {e}")
+        return
     
-    first_char = text[0].lower()
-    if first_char not in valid_initials and first_char not in valid_finals:
-        return False
+    dag_ready.set()
+    print("[初始化] 拼音词库加载完成")
     
-    return True
+    # 通知工作线程补算加载期间的请求；队列中已有请求时它会在加载完成后被处理，无需通知
+    try:
+        candidate_queue.put_nowait(_DAG_LOADED)
+    except queue.Full:
+        pass
 
 def get_top_candidates(pinyin, top_k=5):
     """
@@ -198,183 +458,487 @@ def get_top_candidates(pinyin, top_k=5):
         top_k (int): 返回前 k 个候选
         
     Returns:
-        List[str]: 候选字/词列表
+        Tuple[str, ...]: 候选字/词元组，词库尚未加载完成时为空
     """
-    try:
-        # 使用 Pinyin2Hanzi 进行转换
-        candidates = simple_seg(pinyin, top_k=top_k, dagparams=dag_params)
-        return list(candidates)
-    except:
-        return []
+    if not dag_ready.is_set():
+        return ()
+    # 使用 Pinyin2Hanzi 进行转换（结果由 _dag_candidates 按音节缓存）
+    return simple_seg(pinyin, top_k=top_k, dagparams=dag_params)
+
+# ==================== 候选词计算 ====================
+
+def request_candidates(pinyin):
+    """
+    提交候选词计算请求（由键盘回调调用，立即返回）。
+    队列容量为 1，若已有未处理的请求则用最新请求替换。
+    
+    Args:
+        pinyin (str): 当前拼音缓冲区快照
+    """
+    global candidate_seq
+    
+    with candidate_lock:
+        seq = next(latest_seq)
+        candidate_seq = seq
+    
+    # 丢弃尚未处理的旧请求，换成最新请求
+    _put_latest(candidate_queue, (seq, pinyin))
+
+def clear_candidates():
+    """
+    清空候选词，并使所有未完成的计算请求失效。
+    """
+    global candidate_seq, candidates_seq, current_candidates
+    
+    with candidate_lock:
+        seq = next(latest_seq)
+        candidate_seq = seq
+        candidates_seq = seq
+        current_candidates = ()
+
+def published_candidates():
+    """
+    获取与当前缓冲区一致的候选词（上屏/选词时调用，不做任何计算）。
+    
+    Returns:
+        Tuple[str, ...]: 候选字/词元组；工作线程尚未算完最新请求时为 None
+    """
+    with candidate_lock:
+        if candidates_seq == candidate_seq:
+            return current_candidates
+    return None
+
+def candidate_worker():
+    """
+    候选词计算工作线程。
+    只处理最新的请求，过期请求直接丢弃；结果通过 ui_queue 通知 UI。
+    阻塞等待请求，request_stop() 放入 None 唤醒并结束线程。
+    """
+    global candidates_seq, current_candidates
+    
+    pending = None  # 词库加载完成前处理过的最新请求，收到 _DAG_LOADED 后重新计算
+    while not stop_event.is_set():
+        item = candidate_queue.get()
+        if item is None:
+            break
+        if item is _DAG_LOADED:
+            if pending is None:
+                continue
+            item = pending
+        seq, pinyin = item
+        
+        if seq != candidate_seq:
+            continue
+        
+        pending = None if dag_ready.is_set() else item
+        try:
+            candidates = get_top_candidates(pinyin, top_k=5)
+        except Exception as e:
+            print(f"[错误] 候选词计算错误: {e}")
+            continue
+        
+        with candidate_lock:
+            # 计算期间缓冲区可能已变化，过期结果直接丢弃
+            if seq != candidate_seq:
+                continue
+            candidates_seq = seq
+            current_candidates = candidates
+            # 持锁提交：clear_candidates() 之后不会再有旧的可见状态覆盖隐藏状态
+            ui_put(UIState(visible=True, buffer=pinyin, candidates=candidates))
+
+# ==================== 上屏 ====================
+
+def request_commit(kind, payload):
+    """
+    提交上屏任务（由键盘回调调用，立即返回）。
+    
+    Args:
+        kind (str): "text" 直接上屏 payload；"pinyin" 先计算候选词再上屏；
+            "key" 重放暂缓的按键事件
+        payload: 文本、拼音，或 (vk, scan, flags, modifiers) 元组
+    """
+    output_queue.put((kind, payload))
+
+def output_worker():
+    """
+    上屏工作线程。按入队顺序执行上屏任务：
+    - ("text", text)：直接上屏
+    - ("pinyin", pinyin)：上屏第一个候选词，无候选时上屏拼音本身
+    - ("key", (vk, scan, flags, modifiers))：重放上屏期间暂缓的按键
+    request_stop() 放入 None 结束线程。
+    """
+    while True:
+        task = output_queue.get()
+        try:
+            if task is None:
+                break
+            kind, output = task
+            if kind == "key":
+                send_key(*output)
+                continue
+            if kind == "pinyin":
+                candidates = get_top_candidates(output, top_k=5)
+                if candidates:
+                    output = candidates[0]
+            if DEBUG:
+                print(f"[上屏] 输出: '{output}'")
+            commit_text(output)
+        except Exception as e:
+            print(f"[错误] 上屏任务失败: {e}")
+        finally:
+            output_queue.task_done()
 
 # ==================== 键盘事件处理 ====================
 
+# 按键集合（模块级常量，避免每次事件都构建元组并线性查找）
+CTRL_KEYS = frozenset({keyboard.Key.ctrl, keyboard.Key.ctrl_l, keyboard.Key.ctrl_r})
+SHIFT_KEYS = frozenset({keyboard.Key.shift, keyboard.Key.shift_l, keyboard.Key.shift_r})
+CANDIDATE_SELECT_CHARS = frozenset('12345')
+
+def _on_ctrl_press():
+    """组合键状态跟踪：Ctrl 按下"""
+    global ctrl_pressed
+    ctrl_pressed = True
+
+def _on_shift_press():
+    """
+    情况 0：Ctrl+Shift 键（强制切换模式）
+    """
+    global current_mode, shift_pressed
+    
+    shift_pressed = True
+    # 只在 Ctrl+Shift 时切换模式
+    if not _ctrl_down():
+        # 仅 Shift，不处理
+        return
+    
+    # 强制切换模式：清空 buffer 并切换模式
+    if current_mode == "pinyin":
+        current_mode = "english"
+        if DEBUG:
+            print("[Ctrl+Shift 切换] 切换到英文模式")
+    elif current_mode == "english":
+        current_mode = "pinyin"
+        if DEBUG:
+            print("[Ctrl+Shift 切换] 切换到中文拼音模式")
+    else:
+        current_mode = "pinyin"
+        if DEBUG:
+            print("[Ctrl+Shift 切换] 切换到中文拼音模式")
+    
+    buffer_clear()
+    clear_candidates()
+    ui_put(UIState(visible=(current_mode == "pinyin"), buffer="", candidates=()))
+    
+    # 通知托盘更新图标和菜单
+    request_tray_update(current_mode)
+
+def _on_buffer_changed():
+    """
+    缓冲区内容变化后：重新判断输入模式、更新托盘，并请求候选词或隐藏输入框。
+    
+    Returns:
+        str: 当前缓冲区内容
+    """
+    global current_mode
+    
+    input_buffer = buffer_text()
+    
+    # 判断当前模式
+    if not input_buffer:
+        current_mode = "unknown"
+    elif is_pinyin_sequence_prefix(input_buffer):
+        current_mode = "pinyin"
+    else:
+        current_mode = "english"
+    
+    # 如果模式变更，更新托盘（模式未变化时 update_tray 直接返回）
+    if current_mode in ("pinyin", "english"):
+        request_tray_update(current_mode)
+    
+    # 重新计算候选词（交给候选词工作线程，结果异步通知 UI）
+    if current_mode == "pinyin":
+        request_candidates(input_buffer)
+    else:
+        clear_candidates()
+        ui_put(UIState(visible=False, buffer=input_buffer, candidates=()))
+    
+    return input_buffer
+
+def _on_backspace_press():
+    """
+    情况 1：Backspace（退格）
+    """
+    # 字母已被拦截、尚未送达应用，因此英文模式下同样在缓冲区内退格
+    if input_buf:
+        buffer_backspace()
+        input_buffer = _on_buffer_changed()
+        
+        if DEBUG:
+            print(f"[退格] 删除后 buffer: '{input_buffer}', 模式: {current_mode}")
+
+def _on_esc_press():
+    """
+    情况 2：ESC（停止监听）
+    """
+    print("[ESC] 停止监听")
+    request_stop()
+    return False
+
+def _on_letter_press(ch):
+    """
+    情况 3：字母（a-z, A-Z）
+    """
+    buffer_append(ch)
+    input_buffer = _on_buffer_changed()
+    
+    if DEBUG:
+        print(f"[输入] buffer: '{input_buffer}', 模式: {current_mode}")
+
+def _commit_buffer(keep_tail):
+    """
+    上屏缓冲区：中文模式输出第一个候选词（无候选时输出拼音本身），英文模式输出原文。
+    
+    Args:
+        keep_tail (bool): 中文模式下候选词未覆盖的尾部（如 'nih' 中的 h）
+            是否留在缓冲区继续输入；为 False 时尾部按原文一并上屏
+    """
+    input_buffer = buffer_text()
+    consumed = len(input_buffer)
+    if current_mode == "pinyin":
+        # 候选词只覆盖开头的完整音节
+        head = ''.join(leading_syllables(input_buffer))
+        candidates = published_candidates()
+        if candidates is None and head:
+            # 候选词尚未算好时交给上屏线程计算，不在键盘回调中调用 dag()
+            request_commit("pinyin", input_buffer[:len(head)])
+            consumed = len(head)
+        elif candidates:
+            request_commit("text", candidates[0])
+            consumed = len(head)
+        else:
+            request_commit("text", input_buffer)
+        
+        if consumed < len(input_buffer) and not keep_tail:
+            request_commit("text", input_buffer[consumed:])
+            consumed = len(input_buffer)
+    else:
+        # 英文模式：直接输出缓冲区
+        request_commit("text", input_buffer)
+    
+    buffer_drop_head(consumed)
+    _on_buffer_changed()
+
+def _on_commit_press():
+    """
+    情况 4：Space/Enter（上屏）
+    中文模式下候选词未覆盖的尾部留在缓冲区，可继续输入。
+    """
+    if input_buf:
+        _commit_buffer(keep_tail=True)
+
+def _on_candidate_select(ch):
+    """
+    情况 5：数字键 1-5（含小键盘，候选词选择）
+    
+    Returns:
+        bool: 是否选中并上屏了候选词
+    """
+    if current_mode == "pinyin" and input_buf:
+        # 仅在候选词已与缓冲区一致时选词
+        candidates = published_candidates()
+        idx = int(ch) - 1
+        if candidates and idx < len(candidates):
+            output = candidates[idx]
+            if DEBUG:
+                print(f"[选词] 选择: '{output}'")
+            request_commit("text", output)
+            
+            # 候选词只覆盖开头的完整音节，尾部留在缓冲区
+            buffer_drop_head(len(''.join(leading_syllables(buffer_text()))))
+            _on_buffer_changed()
+            return True
+    return False
+
+# 特殊按键 -> 处理函数（字母与数字键走 on_press 中的字符分支）
+KEY_PRESS_HANDLERS = {
+    **{k: _on_ctrl_press for k in CTRL_KEYS},
+    **{k: _on_shift_press for k in SHIFT_KEYS},
+    keyboard.Key.space: _on_commit_press,
+    keyboard.Key.enter: _on_commit_press,
+    keyboard.Key.backspace: _on_backspace_press,
+    keyboard.Key.esc: _on_esc_press,
+}
+
 def on_press(key):
     """
-    键盘按下事件回调函数。
+    键盘按下事件回调函数（非 Windows 环境使用；Windows 下由 win32_event_filter 处理）。
     新逻辑：
-    - 监听所有按键（使用 suppress=True 拦截系统输入）
+    - 监听所有按键（由 win32_event_filter 拦截输入法需要处理的按键）
     - 当用户输入字母时，不让字母直接发送给系统，而是先放入缓存
     - 在 Space/Enter 时，根据缓存内容是"英文模式"还是"中文拼音模式"
-      决定是模拟输入英文，还是仅在控制台显示拼音
-    - Backspace：中文模式时删除 buffer 最后一个字母
+      决定上屏英文原文还是候选词（通过 SendInput 注入）
+    - Backspace：删除 buffer 最后一个字母
     - 数字键 1-5：中文模式时选择对应候选词并上屏
     - Ctrl+Shift：强制切换模式（仿搜狗输入法）
+    
+    特殊按键通过 KEY_PRESS_HANDLERS 一次哈希查找分派；
+    字母与数字键作为兜底分支处理。
     """
-    global input_buffer, raw_input_buffer, current_mode, current_candidates
-    global ctrl_pressed, shift_pressed
+    handler = KEY_PRESS_HANDLERS.get(key)
+    if handler:
+        return handler()
 
     # 先尝试获取字符形式
     try:
         ch = key.char
     except AttributeError:
-        ch = None
-
-    # ========== 组合键状态跟踪 ==========
-    if key in (keyboard.Key.ctrl, keyboard.Key.ctrl_l, keyboard.Key.ctrl_r):
-        ctrl_pressed = True
         return
 
-    # ========== 情况 0：Ctrl+Shift 键（强制切换模式） ==========
-    if key == keyboard.Key.shift or key == keyboard.Key.shift_l or key == keyboard.Key.shift_r:
-        shift_pressed = True
-        # 只在 Ctrl+Shift 时切换模式
-        if not ctrl_pressed:
-            # 仅 Shift，不处理
-            return
-        
-        # 强制切换模式：清空 buffer 并切换模式
-        if current_mode == "pinyin":
-            current_mode = "english"
-            print("[Ctrl+Shift 切换] 切换到英文模式")
-        elif current_mode == "english":
-            current_mode = "pinyin"
-            print("[Ctrl+Shift 切换] 切换到中文拼音模式")
-        else:
-            current_mode = "pinyin"
-            print("[Ctrl+Shift 切换] 切换到中文拼音模式")
-        
-        input_buffer = ""
-        raw_input_buffer = ""
-        current_candidates = []
-        ui_queue.put(UIState(visible=(current_mode == "pinyin"), buffer="", candidates=[]))
-        
-        # 通知托盘更新图标和菜单
-        update_tray_menu(current_mode)
-        update_tray_icon_image(current_mode)
-        
+    if not ch:
         return
 
-    # ========== 情况 1：Backspace（退格） ==========
-    if key == keyboard.Key.backspace:
-        if current_mode == "pinyin" and input_buffer:
-            input_buffer = input_buffer[:-1]
-            raw_input_buffer = raw_input_buffer[:-1]
-            
-            prev_mode = current_mode
-            
-            if input_buffer:
-                if is_pinyin_sequence_prefix(input_buffer):
-                    current_mode = "pinyin"
-                else:
-                    current_mode = "english"
-            else:
-                current_mode = "unknown"
-            
-            if current_mode != prev_mode:
-                if current_mode in ("pinyin", "english"):
-                    update_tray_menu(current_mode)
-                    update_tray_icon_image(current_mode)
-            
-            if current_mode == "pinyin":
-                current_candidates = get_top_candidates(input_buffer, top_k=5)
-                ui_queue.put(UIState(visible=True, buffer=input_buffer, candidates=current_candidates))
-            else:
-                current_candidates = []
-                ui_queue.put(UIState(visible=False, buffer=input_buffer, candidates=[]))
-            
-            print(f"[退格] 删除后 buffer: '{input_buffer}', 模式: {current_mode}")
-            return
+    if ch.isascii() and ch.isalpha():
+        _on_letter_press(ch)
+    elif ch in CANDIDATE_SELECT_CHARS:
+        _on_candidate_select(ch)
 
-    # ========== 情况 2：ESC（停止监听） ==========
-    if key == keyboard.Key.esc:
-        print("[ESC] 停止监听")
-        stop_event.set()
-        return False
+# ==================== 按键拦截（Win32） ====================
+
+# 钩子中直接按虚拟键码分派的特殊按键
+VK_PRESS_HANDLERS = {
+    VK_ESCAPE: _on_esc_press,
+    VK_LSHIFT: _on_shift_press,
+    VK_RSHIFT: _on_shift_press,
+}
 
-    # ========== 情况 3：字母（a-z, A-Z） ==========
-    if ch and ch.isalpha():
-        raw_input_buffer += ch
+# 缓冲区非空时由输入法处理（并拦截）的按键
+VK_BUFFER_HANDLERS = {
+    VK_BACK: _on_backspace_press,
+}
+
+# 缓冲区非空且为中文模式时由输入法处理（并拦截）的按键；
+# 英文模式下 Space/Enter 先上屏缓冲区，按键本身照常传递
+VK_PINYIN_HANDLERS = {
+    VK_SPACE: _on_commit_press,
+    VK_RETURN: _on_commit_press,
+}
+
+# 修饰键：照常传递，不触发上屏，也不暂缓
+MODIFIER_VKS = frozenset({
+    VK_SHIFT, VK_CONTROL, VK_MENU, VK_CAPITAL, VK_LWIN, VK_RWIN,
+    VK_LSHIFT, VK_RSHIFT, VK_LCONTROL, VK_RCONTROL, VK_LMENU, VK_RMENU,
+})
+
+def _dispatch_vk(vk):
+    """
+    按虚拟键码处理输入法按键（字母、Backspace，以及中文模式下的 Space/Enter、1-5 与小键盘 1-5）。
+    
+    Args:
+        vk (int): 虚拟键码
         
-        # 判断当前模式
-        prev_mode = current_mode
-        if is_pinyin_sequence_prefix(raw_input_buffer):
-            current_mode = "pinyin"
-            input_buffer = raw_input_buffer
-        else:
-            current_mode = "english"
-            input_buffer = raw_input_buffer
-        
-        # 如果模式变更，更新托盘
-        if current_mode != prev_mode and current_mode in ("pinyin", "english"):
-            update_tray_menu(current_mode)
-            update_tray_icon_image(current_mode)
-        
-        # 重新计算候选词
-        if current_mode == "pinyin":
-            current_candidates = get_top_candidates(input_buffer, top_k=5)
-            ui_queue.put(UIState(visible=True, buffer=input_buffer, candidates=current_candidates))
-        else:
-            current_candidates = []
-            ui_queue.put(UIState(visible=False, buffer=input_buffer, candidates=[]))
+    Returns:
+        bool: 是否已处理（已处理的按键需要拦截）
+    """
+    if 0x41 <= vk <= 0x5A:
+        # 字母键：根据 Shift 与 CapsLock 决定大小写
+        caps = bool(ctypes.windll.user32.GetKeyState(VK_CAPITAL) & 1)
+        _on_letter_press(chr(vk) if _shift_down() != caps else chr(vk | 0x20))
+        return True
+    if not input_buf:
+        return False
+    handler = VK_BUFFER_HANDLERS.get(vk)
+    if handler:
+        handler()
+        return True
+    if current_mode == "pinyin":
+        handler = VK_PINYIN_HANDLERS.get(vk)
+        if handler:
+            handler()
+            return True
+        # 数字键选词（Shift+数字是标点）；未选中候选词时按普通按键处理：
+        # 先上屏缓冲区，数字照常传递
+        if _shift_down():
+            return False
+        if 0x31 <= vk <= 0x35:
+            return _on_candidate_select(chr(vk))
+        if 0x61 <= vk <= 0x65:
+            # 小键盘 1-5（VK_NUMPAD1..VK_NUMPAD5）
+            return _on_candidate_select(chr(vk - 0x30))
+    return False
+
+def _defer_key(msg, data):
+    """
+    暂缓一个按键事件：交给上屏线程在已入队的上屏任务之后重放。
+    按下事件同时记录当时的修饰键状态，重放时按该状态还原（见 send_key）。
+    
+    Args:
+        msg (int): 窗口消息
+        data: KBDLLHOOKSTRUCT
+    """
+    if msg in (WM_KEYUP, WM_SYSKEYUP):
+        flags = KEYEVENTF_KEYUP
+        modifiers = None
+    else:
+        flags = 0
+        modifiers = modifiers_down()
+    if data.flags & LLKHF_EXTENDED:
+        flags |= KEYEVENTF_EXTENDEDKEY
+    request_commit("key", (data.vkCode, data.scanCode, flags, modifiers))
+
+def win32_event_filter(msg, data):
+    """
+    底层键盘钩子过滤函数（pynput 的 WH_KEYBOARD_LL 钩子中、转换按键对象之前执行）。
+    Windows 下所有按键都在这里按虚拟键码直接解码和分派，
+    不再经过 pynput 的按键转换与 on_press/on_release 回调。
+    - 忽略 commit_text 注入的事件，避免上屏文本被再次当作输入
+    - 字母、以及缓冲区非空时的 Backspace 与中文模式下的 Space/Enter/1-5 由输入法处理并拦截，
+      不再发送给焦点窗口；按住 Ctrl/Alt/Win 时字母不拦截
+    - 缓冲区非空时按下其他非修饰键：先上屏缓冲区，再传递该按键；
+      上屏任务尚未完成时，非修饰键事件暂缓并在上屏之后重放，保证先后顺序；
+      修饰键照常传递，重放时按按键发生时记录的修饰键状态还原组合键
+    - 钩子中只做缓冲区编辑与入队，上屏（SendInput）、候选词计算与托盘刷新
+      都在其他线程执行，保证钩子在 LowLevelHooksTimeout 内返回
+    - Ctrl/Shift/Win 状态通过 GetAsyncKeyState 读取，无需跟踪按下/抬起
+    
+    Args:
+        msg (int): 窗口消息（WM_KEYDOWN 等）
+        data: KBDLLHOOKSTRUCT
         
-        print(f"[输入] buffer: '{input_buffer}', 模式: {current_mode}, 候选词: {current_candidates}")
-        return
+    Returns:
+        bool: 始终为 False，事件已在此处理完毕
+    """
+    if data.flags & LLKHF_INJECTED:
+        return False
     
-    # ========== 情况 4：Space/Enter（上屏） ==========
-    if key in (keyboard.Key.space, keyboard.Key.enter):
-        if input_buffer:
-            if current_mode == "pinyin":
-                # 中文模式：输出第一个候选词或拼音本身
-                if current_candidates:
-                    output = current_candidates[0]
-                else:
-                    output = input_buffer
-                print(f"[上屏] 输出: '{output}'")
-            else:
-                # 英文模式：直接输出缓冲区
-                output = input_buffer
-                print(f"[上屏] 输出: '{output}'")
-            
-            # 清空缓冲区
-            input_buffer = ""
-            raw_input_buffer = ""
-            current_candidates = []
-            current_mode = "unknown"
-            ui_queue.put(UIState(visible=False, buffer="", candidates=[]))
-        return
+    vk = data.vkCode
+    if msg == WM_KEYDOWN or msg == WM_SYSKEYDOWN:
+        handler = VK_PRESS_HANDLERS.get(vk)
+        if handler:
+            handler()
+        elif (msg == WM_KEYDOWN and not _ctrl_down() and not _win_down()
+              and _dispatch_vk(vk)):
+            _suppressed_vks.add(vk)
+            listener.suppress_event()
+        elif vk not in MODIFIER_VKS and input_buf:
+            # 非输入法按键：先上屏整个缓冲区，使其排在该按键之前
+            _commit_buffer(keep_tail=False)
+    elif vk in _suppressed_vks:
+        _suppressed_vks.discard(vk)
+        listener.suppress_event()
     
-    # ========== 情况 5：数字键 1-5（候选词选择） ==========
-    if ch and ch.isdigit() and ch in '12345':
-        if current_mode == "pinyin" and current_candidates:
-            idx = int(ch) - 1
-            if idx < len(current_candidates):
-                output = current_candidates[idx]
-                print(f"[选词] 选择: '{output}'")
-                
-                # 清空缓冲区
-                input_buffer = ""
-                raw_input_buffer = ""
-                current_candidates = []
-                current_mode = "unknown"
-                ui_queue.put(UIState(visible=False, buffer="", candidates=[]))
-                return
+    # 仍有上屏任务未完成：按键若直接传递会抢在上屏文本之前送达，改为排队重放
+    if vk not in MODIFIER_VKS and output_queue.unfinished_tasks:
+        _defer_key(msg, data)
+        listener.suppress_event()
+    
+    return False
 
 # ==================== 按键释放处理 ====================
 
 def on_release(key):
     """
-    键盘抬起事件回调函数。
+    键盘抬起事件回调函数（非 Windows 环境使用）。
     - Ctrl 抬起时重置 ctrl_pressed
     - Shift 抬起时重置 shift_pressed
     - ESC 抬起时停止监听
@@ -382,25 +946,38 @@ def on_release(key):
     global ctrl_pressed, shift_pressed
     
     # 更新按键状态
-    if key in (keyboard.Key.ctrl, keyboard.Key.ctrl_l, keyboard.Key.ctrl_r):
+    if key in CTRL_KEYS:
         ctrl_pressed = False
         return
     
-    if key in (keyboard.Key.shift, keyboard.Key.shift_l, keyboard.Key.shift_r):
+    if key in SHIFT_KEYS:
         shift_pressed = False
         return
     
     # ESC 键停止程序
     if key == keyboard.Key.esc:
         print("检测到 ESC，停止监听。")
-        stop_event.set()
+        request_stop()
         return False
 
 # ================== 托盘菜单与图标管理 ==================
 
-def get_tray_icon_image(mode: str) -> Image.Image:
+# 托盘图标像素数据（32x32 RGBA 原始像素，zlib 压缩后 base64 编码）
+# 由 zh.png / en.png 生成，修改图标后用以下方式重新生成：
+#   base64.b64encode(zlib.compress(Image.open("zh.png").convert("RGBA").tobytes(), 9))
+TRAY_ICON_SIZE = (32, 32)
+_ZH_ICON_RGBA = (
+    b"eNr7//8/w/9RzMBQseU/vfFgtJ+eYT1q/6j9Q8F+oHgvEB+A4sNA/AtJ7gMW9R9o5X+gmnwgbh8I+4HyUkB8EYi5Bsj+lUDsTcgu"
+    b"WtgPlHMH4jVYxL8hpQ0Y/kbl9McBxOeBWIYYv1Lb/0DxZiAuwiFHD/t/QvMdchjzDET+Gy1/R+0ftX/U/lH7aWP/SO1/DRQGABD8EVE="
+)
+_EN_ICON_RGBA = (
+    b"eNr7//8/w/9RzHAiJeU/vfFgtJ+eYT1q/6j9g9l+IP8bEB9AwkVQ8e9AvB9N7Qca2P8Bh/4PQHwYiB0G0H4nID44UPZD6YNA7EhD"
+    b"+9Hj3xLNfgcgPjRQ/oey90PjYqDst4OmRXqEfzs2dwH5e0F5crT8G7V/1P5R+0ftH7r2j9T+10BhAGindqY="
+)
+
+def _build_icon(mode: str) -> Image.Image:
     """
-    获取托盘图标。
+    由内嵌的像素数据构建托盘图标（无磁盘读取与 PNG 解码，仅在启动时调用）。
     
     Args:
         mode (str): 输入模式 (pinyin, english, unknown)
@@ -408,57 +985,42 @@ def get_tray_icon_image(mode: str) -> Image.Image:
     Returns:
         Image.Image: 图标 PIL 图像
     """
-    # 尝试从文件加载
-    if mode == "pinyin":
-        icon_path = resource_path("zh.png")
-    else:
-        icon_path = resource_path("en.png")
-    
-    try:
-        if os.path.exists(icon_path):
-            return Image.open(icon_path).convert("RGBA")
-    except:
-        pass
-    
-    # 如果文件不存在或加载失败，创建默认图标
-    img = Image.new('RGBA', (32, 32), (255, 255, 255, 0))
-    d = ImageDraw.Draw(img)
-    
-    if mode == "pinyin":
-        # 中文模式：绘制 "中"
-        d.rectangle([2, 2, 30, 30], outline=(0, 120, 180), width=2)
-        d.text((8, 8), "中", fill=(0, 120, 180))
-    else:
-        # 英文模式：绘制 "EN"
-        d.rectangle([2, 2, 30, 30], outline=(200, 100, 100), width=2)
-        d.text((6, 8), "EN", fill=(200, 100, 100))
-    
-    return img
+    data = _ZH_ICON_RGBA if mode == "pinyin" else _EN_ICON_RGBA
+    pixels = zlib.decompress(base64.b64decode(data))
+    return Image.frombuffer("RGBA", TRAY_ICON_SIZE, pixels, "raw", "RGBA", 0, 1)
 
-def update_tray_icon_image(mode: str):
+def preload_tray_icons():
     """
-    更新托盘图标。
+    预加载所有模式的托盘图标到 _ICON_CACHE。
+    """
+    for mode in ("pinyin", "english", "unknown"):
+        _ICON_CACHE[mode] = _build_icon(mode)
+
+def get_tray_icon_image(mode: str) -> Image.Image:
+    """
+    获取托盘图标（从缓存读取，不访问磁盘）。
     
     Args:
-        mode (str): 输入模式
+        mode (str): 输入模式 (pinyin, english, unknown)
+        
+    Returns:
+        Image.Image: 图标 PIL 图像
     """
-    global tray_icon
-    if tray_icon:
-        try:
-            img = get_tray_icon_image(mode)
-            tray_icon.icon = img
-        except Exception as e:
-            print(f"更新托盘图标失败: {e}")
+    if not _ICON_CACHE:
+        preload_tray_icons()
+    return _ICON_CACHE.get(mode) or _ICON_CACHE["unknown"]
 
-def update_tray_menu(mode: str):
+@functools.lru_cache(maxsize=4)
+def _build_menu(mode: str) -> Menu:
     """
-    更新托盘菜单。
+    构建托盘菜单（每种模式只构建一次）。
     
     Args:
         mode (str): 输入模式
+        
+    Returns:
+        Menu: 托盘菜单
     """
-    global tray_icon, tray_menu
-    
     if mode == "pinyin":
         mode_text = "中文模式 🇨🇳"
     elif mode == "english":
@@ -466,44 +1028,70 @@ def update_tray_menu(mode: str):
     else:
         mode_text = "未知模式"
     
-    # 创建菜单
-    tray_menu = Menu(
+    return Menu(
         MenuItem(f"当前模式: {mode_text}", lambda icon, item: None),
         MenuItem("强制切换模式 (Ctrl+Shift)", lambda icon, item: None),
         Menu.SEPARATOR,
         MenuItem("退出 (ESC)", lambda icon, item: quit_from_tray(icon)),
     )
+
+def update_tray(mode: str):
+    """
+    同时更新托盘图标和菜单。模式未变化时直接返回，不触发托盘重绘。
     
-    if tray_icon:
+    Args:
+        mode (str): 输入模式
+    """
+    global tray_menu, _last_tray_mode
+    
+    if mode == _last_tray_mode or tray_icon is None:
+        return
+    
+    try:
+        tray_menu = _build_menu(mode)
+        tray_icon.icon = get_tray_icon_image(mode)
         tray_icon.menu = tray_menu
+        _last_tray_mode = mode
+    except Exception as e:
+        print(f"更新托盘失败: {e}")
+
+def request_tray_update(mode: str):
+    """
+    请求更新托盘（由键盘回调调用，立即返回）。
+    pystray 调用由 UI 工作线程执行，不在键盘钩子中进行。
+    
+    Args:
+        mode (str): 输入模式
+    """
+    global _pending_tray_mode
+    
+    _pending_tray_mode = mode
+    _ui_wake.set()
 
 def quit_from_tray(icon):
     """从托盘退出程序"""
     global tray_icon
     icon.stop()
-    stop_event.set()
+    request_stop()
 
 def setup_tray():
     """
     设置系统托盘。
     在单独的线程中运行，不阻塞主线程。
     """
-    global tray_icon, tray_menu
+    global tray_icon, tray_menu, _last_tray_mode
     
     try:
         # 创建初始菜单
-        tray_menu = Menu(
-            MenuItem("当前模式: 未知模式", lambda icon, item: None),
-            MenuItem("强制切换模式 (Ctrl+Shift)", lambda icon, item: None),
-            Menu.SEPARATOR,
-            MenuItem("退出 (ESC)", lambda icon, item: quit_from_tray(icon)),
-        )
+        tray_menu = _build_menu("unknown")
         
-        # 创建图标
+        # 预加载并创建图标
+        preload_tray_icons()
         img = get_tray_icon_image("unknown")
         
         # 创建托盘图标
         tray_icon = Icon("SmartInput", img, menu=tray_menu)
+        _last_tray_mode = "unknown"
         
         print("[托盘] SmartInput 托盘已启动")
         
@@ -518,20 +1106,33 @@ def setup_tray():
 def ui_worker():
     """
     处理 UI 更新的工作线程。
-    监听 ui_queue，更新显示状态。
+    监听 ui_queue，更新显示状态；同时负责刷新托盘图标和菜单。
     """
     print("[UI] UI 工作线程已启动")
     
     while not stop_event.is_set():
+        # 无新状态时阻塞等待，不做定时轮询
+        _ui_wake.wait()
+        _ui_wake.clear()
+        
+        # 模式未变化时 update_tray 直接返回
+        mode = _pending_tray_mode
+        if mode:
+            update_tray(mode)
+        
         try:
-            state = ui_queue.get(timeout=0.5)
+            # 只渲染最新状态，中间状态直接丢弃
+            state = None
+            while True:
+                try:
+                    state = ui_queue.get_nowait()
+                except queue.Empty:
+                    break
             if state:
                 if state.visible:
                     print(f"[UI] 显示: 缓冲区='{state.buffer}', 候选词={state.candidates}")
                 else:
                     print(f"[UI] 隐藏输入框")
-        except queue.Empty:
-            continue
         except Exception as e:
             print(f"[错误] UI 处理错误: {e}")
     
@@ -549,11 +1150,15 @@ def main():
     print("版本: 1.0.0")
     print("=" * 60)
     
-    global tray_thread
+    global tray_thread, listener
     
     try:
+        # 0. 后台加载拼音词库（不阻塞启动，英文输入立即可用）
+        print("\n[初始化] 后台加载拼音词库...")
+        threading.Thread(target=_load_dag, daemon=True).start()
+        
         # 1. 启动托盘线程
-        print("\n[初始化] 启动托盘线程...")
+        print("[初始化] 启动托盘线程...")
         tray_thread = threading.Thread(target=setup_tray, daemon=True)
         tray_thread.start()
         
@@ -562,14 +1167,28 @@ def main():
         ui_thread = threading.Thread(target=ui_worker, daemon=True)
         ui_thread.start()
         
-        # 3. 启动全局键盘监听
+        # 3. 启动候选词计算线程
+        print("[初始化] 启动候选词计算线程...")
+        candidate_thread = threading.Thread(target=candidate_worker, daemon=True)
+        candidate_thread.start()
+        
+        # 4. 启动上屏线程
+        print("[初始化] 启动上屏线程...")
+        output_thread = threading.Thread(target=output_worker, daemon=True)
+        output_thread.start()
+        
+        # 5. 启动全局键盘监听
         print("[初始化] 启动键盘监听线程...")
         print("[提示] 按 ESC 停止程序")
         print("[提示] 按 Ctrl+Shift 切换输入法模式")
         print("[初始化] SmartInput 已启动\n")
         
         # 创建键盘监听器
-        listener = keyboard.Listener(on_press=on_press, on_release=on_release)
+        listener = keyboard.Listener(
+            on_press=on_press,
+            on_release=on_release,
+            win32_event_filter=win32_event_filter,
+        )
         listener.start()
         
         # 等待停止事件
@@ -580,6 +1199,7 @@ def main():
                 break
         
         # 清理
+        request_stop()
         print("\n[清理] 停止键盘监听...")
         listener.stop()
         listener.join(timeout=2)
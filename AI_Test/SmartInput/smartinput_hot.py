@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+SmartInput 热点路径模块
+描述:
+  每次按键都会执行的纯计算逻辑：输入缓冲区维护、拼音前缀判断、拼音分词。
+  不依赖 pynput/pystray 等第三方库，并带有完整的类型注解，
+  可以直接用 mypyc 编译为 C 扩展（见 build.bat）：
+
+    mypyc smartinput_hot.py
+
+  编译产物与本文件同名，存在时 Python 会优先导入编译版本，
+  否则使用本纯 Python 实现，两者行为完全一致。
+"""
+
+from array import array
+from typing import Dict, Final, FrozenSet, List, Tuple
+
+# ==================== 拼音音节表 ====================
+
+# 合法拼音音节表（ü 按 Pinyin2Hanzi 的约定写作 v）
+PINYIN_SYLLABLES: Final[FrozenSet[str]] = frozenset("""
+a ai an ang ao ba bai ban bang bao bei ben beng bi bian biao bie bin bing bo bu
+ca cai can cang cao ce cen ceng cha chai chan chang chao che chen cheng chi chong
+chou chu chua chuai chuan chuang chui chun chuo ci cong cou cu cuan cui cun cuo
+da dai dan dang dao de dei den deng di dia dian diao die ding diu dong dou du
+duan dui dun duo e ei en eng er fa fan fang fei fen feng fo fou fu ga gai gan
+gang gao ge gei gen geng gong gou gu gua guai guan guang gui gun guo ha hai han
+hang hao he hei hen heng hong hou hu hua huai huan huang hui hun huo ji jia jian
+jiang jiao jie jin jing jiong jiu ju juan jue jun ka kai kan kang kao ke kei ken
+keng kong kou ku kua kuai kuan kuang kui kun kuo la lai lan lang lao le lei leng
+li lia lian liang liao lie lin ling liu lo long lou lu luan lun luo lv lve ma
+mai man mang mao me mei men meng mi mian miao mie min ming miu mo mou mu na nai
+nan nang nao ne nei nen neng ni nian niang niao nie nin ning niu nong nou nu
+nuan nun nuo nv nve o ou pa pai pan pang pao pei pen peng pi pian piao pie pin
+ping po pou pu qi qia qian qiang qiao qie qin qing qiong qiu qu quan que qun ran
+rang rao re ren reng ri rong rou ru rua ruan rui run ruo sa sai san sang sao se
+sen seng sha shai shan shang shao she shei shen sheng shi shou shu shua shuai
+shuan shuang shui shun shuo si song sou su suan sui sun suo ta tai tan tang tao
+te teng ti tian tiao tie ting tong tou tu tuan tui tun tuo wa wai wan wang wei
+wen weng wo wu xi xia xian xiang xiao xie xin xing xiong xiu xu xuan xue xun ya
+yan yang yao ye yi yin ying yo yong you yu yuan yue yun za zai zan zang zao ze
+zei zen zeng zha zhai zhan zhang zhao zhe zhei zhen zheng zhi zhong zhou zhu
+zhua zhuai zhuan zhuang zhui zhun zhuo zi zong zou zu zuan zui zun zuo
+""".split())
+
+# 最长音节长度（如 zhuang），决定最长匹配的窗口大小
+MAX_SYLLABLE_LEN: Final[int] = max(len(syllable) for syllable in PINYIN_SYLLABLES)
+
+# 各长度的音节集合，按长度从长到短排列，供最长匹配使用
+_SYLLABLES_BY_LEN: Final[Tuple[Tuple[int, FrozenSet[str]], ...]] = tuple(
+    (length, frozenset(s for s in PINYIN_SYLLABLES if len(s) == length))
+    for length in range(MAX_SYLLABLE_LEN, 0, -1)
+)
+
+# 所有音节的非空前缀（含完整音节），用于判断尚未输完的尾部
+_SYLLABLE_PREFIXES: Final[FrozenSet[str]] = frozenset(
+    s[:k] for s in PINYIN_SYLLABLES for k in range(1, len(s) + 1)
+)
+
+def _suffix_tables(text: str) -> Tuple[List[bool], List[bool]]:
+    """
+    计算每个位置之后的剩余部分能否继续切分。
+    
+    Args:
+        text (str): 小写拼音字符串
+        
+    Returns:
+        Tuple[List[bool], List[bool]]: (complete, valid)
+            complete[j]: text[j:] 可以完整切分为若干音节
+            valid[j]: text[j:] 为"若干完整音节 + 某个音节的前缀"
+    """
+    n = len(text)
+    complete = [False] * (n + 1)
+    valid = [False] * (n + 1)
+    complete[n] = True
+    valid[n] = True
+    for j in range(n - 1, -1, -1):
+        for length, syllables in _SYLLABLES_BY_LEN:
+            if j + length <= n and text[j:j + length] in syllables:
+                complete[j] = complete[j] or complete[j + length]
+                valid[j] = valid[j] or valid[j + length]
+        if not valid[j] and n - j <= MAX_SYLLABLE_LEN and text[j:] in _SYLLABLE_PREFIXES:
+            valid[j] = True
+    return complete, valid
+
+def split_pinyin(pinyin_str: str) -> List[str]:
+    """
+    按合法拼音音节做正向最长匹配分词。
+    只选择剩余部分仍能继续切分的最长音节（如 'fanguo' 切为 fan/guo，
+    而不是 fang/u/o），能完整切分时优先完整切分；
+    无法匹配任何音节的字符（如尚未输完的声母）单独成段。
+    
+    Args:
+        pinyin_str (str): 拼音字符串（如 'nihao'）
+        
+    Returns:
+        List[str]: 音节列表（如 ['ni', 'hao']）
+    """
+    text = pinyin_str.lower()
+    n = len(text)
+    pinyin_list: List[str] = []
+    complete, valid = _suffix_tables(text)
+    i = 0
+    while i < n:
+        # 能完整切分时优先完整切分（如 'biang' 切为 bi/ang 而不是 bian/g）
+        reachable = complete if complete[i] else valid
+        piece = text[i]
+        for length, syllables in _SYLLABLES_BY_LEN:
+            if i + length > n or not reachable[i + length]:
+                continue
+            candidate = text[i:i + length]
+            if candidate in syllables:
+                piece = candidate
+                break
+        pinyin_list.append(piece)
+        i += len(piece)
+    return pinyin_list
+
+def leading_syllables(pinyin_str: str) -> List[str]:
+    """
+    取开头连续的完整音节，不含尚未输完的尾部（如 'nihaoz' 中的 z）。
+    
+    Args:
+        pinyin_str (str): 拼音字符串（如 'nihaoz'）
+        
+    Returns:
+        List[str]: 完整音节列表（如 ['ni', 'hao']）
+    """
+    syllables = split_pinyin(pinyin_str)
+    count = 0
+    while count < len(syllables) and syllables[count] in PINYIN_SYLLABLES:
+        count += 1
+    del syllables[count:]
+    return syllables
+
+# ==================== 拼音识别函数 ====================
+
+# 字母表大小：DFA 只区分 26 个字母，其余字节统一归为第 0 类（拒绝）
+_NUM_CLASSES: Final[int] = 27
+
+def _build_char_classes() -> bytes:
+    """构建字节 -> 字符类查找表：a-z/A-Z 映射为 1..26，其余为 0"""
+    table = bytearray(256)
+    for i in range(26):
+        table[ord('a') + i] = i + 1
+        table[ord('A') + i] = i + 1
+    return bytes(table)
+
+# 字节 -> 字符类查找表
+_CHAR_CLASS: Final[bytes] = _build_char_classes()
+
+def _build_prefix_dfa() -> array:
+    """
+    构建识别"合法拼音序列前缀"的 DFA 转移表。
+    
+    语言为：若干完整音节 + 某个音节的前缀（如 'nih'、'zhongg'）。
+    先把音节表建成字典树，再对"字典树节点集合"做子集构造：
+    走到完整音节时同时回到根节点，以便开始下一个音节。
+    
+    Returns:
+        array: 转移表，TABLE[state * _NUM_CLASSES + class] 为下一状态；
+               状态 0 为拒绝状态，状态 1 为初始状态
+    """
+    # 字典树：children[node] 为 {字符类: 子节点}，terminal[node] 表示完整音节
+    children: List[Dict[int, int]] = [{}]
+    terminal: List[bool] = [False]
+    for syllable in PINYIN_SYLLABLES:
+        node = 0
+        for ch in syllable:
+            cls = _CHAR_CLASS[ord(ch)]
+            child = children[node].get(cls)
+            if child is None:
+                child = len(children)
+                children[node][cls] = child
+                children.append({})
+                terminal.append(False)
+            node = child
+        terminal[node] = True
+    
+    # 子集构造
+    start: FrozenSet[int] = frozenset([0])
+    state_ids: Dict[FrozenSet[int], int] = {start: 1}
+    pending: List[FrozenSet[int]] = [start]
+    transitions: List[Tuple[int, int, int]] = []
+    while pending:
+        nodes = pending.pop()
+        state = state_ids[nodes]
+        for cls in range(1, _NUM_CLASSES):
+            targets = set()
+            for node in nodes:
+                child = children[node].get(cls)
+                if child is not None:
+                    targets.add(child)
+                    if terminal[child]:
+                        targets.add(0)
+            if not targets:
+                continue
+            key = frozenset(targets)
+            target = state_ids.get(key)
+            if target is None:
+                target = len(state_ids) + 1
+                state_ids[key] = target
+                pending.append(key)
+            transitions.append((state, cls, target))
+    
+    table = array('H', bytes(2 * (len(state_ids) + 1) * _NUM_CLASSES))
+    for state, cls, target in transitions:
+        table[state * _NUM_CLASSES + cls] = target
+    return table
+
+# 拼音前缀 DFA 转移表（模块加载时构建一次）
+_PREFIX_DFA: Final[array] = _build_prefix_dfa()
+
+def is_pinyin_sequence_prefix(text: str) -> bool:
+    """
+    检查输入文本是否符合拼音序列的前缀。
+    
+    用 DFA 逐字节查表：每个字符只需一次字符类查找和一次转移表查找，
+    一旦进入拒绝状态立即返回。
+    
+    Args:
+        text (str): 输入的文本
+        
+    Returns:
+        bool: 是否为拼音前缀
+    """
+    if not text or not text.isascii():
+        return False
+    
+    state = 1
+    for b in text.encode('ascii'):
+        state = _PREFIX_DFA[state * _NUM_CLASSES + _CHAR_CLASS[b]]
+        if state == 0:
+            return False
+    return True
+
+# ==================== 输入缓冲区 ====================
+
+input_buf: Final[bytearray] = bytearray()  # 输入缓冲区（拼音，仅 ASCII 字母）
+_input_text = ""  # input_buf 解码后的字符串缓存，编辑时失效
+_input_text_valid = True
+
+def buffer_append(ch: str) -> None:
+    """
+    向缓冲区追加一个 ASCII 字母（单字节写入，不复制已有内容）。
+    
+    Args:
+        ch (str): 单个 ASCII 字母
+    """
+    global _input_text_valid
+    code = ord(ch)
+    input_buf.append(code)
+    _input_text_valid = False
+
+def buffer_backspace() -> None:
+    """删除缓冲区最后一个字符"""
+    global _input_text_valid
+    del input_buf[-1:]
+    _input_text_valid = False
+
+def buffer_drop_head(count: int) -> None:
+    """
+    删除缓冲区开头的 count 个字符（上屏后保留未上屏的尾部）。
+    
+    Args:
+        count (int): 要删除的字符数
+    """
+    global _input_text_valid
+    del input_buf[:count]
+    _input_text_valid = False
+
+def buffer_clear() -> None:
+    """清空缓冲区"""
+    global _input_text, _input_text_valid
+    input_buf.clear()
+    _input_text = ""
+    _input_text_valid = True
+
+def buffer_text() -> str:
+    """
+    获取缓冲区内容的字符串形式。
+    解码结果会被缓存，内容未变化时不会重复解码。
+    
+    Returns:
+        str: 缓冲区字符串
+    """
+    global _input_text, _input_text_valid
+    if not _input_text_valid:
+        _input_text = input_buf.decode('ascii')
+        _input_text_valid = True
+    return _input_text